@@ -16,6 +16,9 @@ from crewai.knowledge.source.string_knowledge_source import StringKnowledgeSourc
 #            verify_payment_by_memo(reference) -> {"ok": bool, ...}
 from solana_pay import create_payment, verify_payment_by_memo
 
+# --- Local query canonicalization (skips the input_collector LLM call when confident) ---
+from query_canon import load_lexicon, canonicalize
+
 # -------------------- ENV --------------------
 load_dotenv(".env")
 
@@ -25,6 +28,7 @@ SERPER_API_KEY     = os.getenv("SERPER_API_KEY")
 MERCHANT_WALLET    = os.getenv("MERCHANT_WALLET")                     # your treasury wallet (required for real QR)
 PLATFORM_FEE_USDC  = float(os.getenv("PLATFORM_FEE_USDC", "0.5"))     # flat fee added on top
 DEMO_VERIFY_ALWAYS_OK = os.getenv("DEMO_VERIFY_ALWAYS_OK", "1") == "1"
+QUERY_CONFIDENCE   = float(os.getenv("QUERY_CONFIDENCE", "0.75"))     # below this, input_collector refines the query
 
 # -------------------- AIML LLM --------------------
 aiml_llm = LLM(
@@ -55,6 +59,13 @@ def parse_price_to_float(value) -> float:
     except:
         return None
 
+# Grocery lexicon (categories, brands, Urdu/Roman-Urdu synonyms, units), loaded once per process
+@st.cache_resource
+def get_lexicon():
+    return load_lexicon()
+
+GROCERY_LEXICON = get_lexicon()
+
 # -------------------- Transcription --------------------
 def transcribe_audio_with_aiml(audio_data):
     # 5 MB limit
@@ -230,6 +241,19 @@ search_task = Task(
     context=[input_task]
 )
 
+# Same search, driven by a locally canonicalized query (no input_collector round-trip)
+quick_search_task = Task(
+    description=(
+        "Search online for the best matching grocery products for: '{search_query}'\n"
+        f"Only keep products with a rating of at least {min_rating}.\n"
+        "Look for listings across Carrefour Pakistan, Metro Cash & Carry, and Imtiaz.\n"
+        "Return a JSON list of the **top 3 grocery products** with fields:\n"
+        "- name, price, rating, url, image_url, source, delivery_time"
+    ),
+    expected_output=search_task.expected_output,
+    agent=web_searcher
+)
+
 analysis_task = Task(
     description=(
         "Analyze structured grocery listings (JSON). Compare price, rating, and delivery time. "
@@ -241,7 +265,7 @@ analysis_task = Task(
         Each entry: name, price, rating, source, delivery_time, reason.
     """,
     agent=analyst,
-    context=[search_task]
+    context=[search_task, quick_search_task]  # whichever ran in this crew
 )
 
 review_task = Task(
@@ -285,6 +309,14 @@ shopping_crew = Crew(
     embedder={"provider": "aimlapi", "config": {"model": "text-embedding-3-large", "api_key": AIML_API_KEY}}
 )
 
+quick_crew = Crew(
+    agents=[web_searcher, analyst, review_agent, recommender],
+    tasks=[quick_search_task, analysis_task, review_task, recommendation_task],
+    verbose=True,
+    process=Process.sequential,
+    embedder={"provider": "aimlapi", "config": {"model": "text-embedding-3-large", "api_key": AIML_API_KEY}}
+)
+
 # -------------------- Streamlit UI --------------------
 
 # background 
@@ -380,6 +412,8 @@ with tabs[0]:
         st.session_state.user_input = ""
     if "checkout" not in st.session_state:
         st.session_state.checkout = {}  # key: idx -> {ref,total,vendor_share,source}
+    if "query_cache" not in st.session_state:
+        st.session_state.query_cache = {}  # key: canonical query key + min_rating -> crew reply
 
     # Chat history display
     for msg in st.session_state.messages:
@@ -412,13 +446,27 @@ with tabs[0]:
 
         with st.chat_message("assistant"):
             with st.spinner("Finding the best grocery deals..."):
-                result = shopping_crew.kickoff(inputs={"user_input": user_msg})
-                reply = result.raw
+                canon = canonicalize(user_msg, GROCERY_LEXICON, brand=brand)
+                cache_key = f"{canon['key']}|{min_rating}"
+                store_key = None  # set only when a fresh quick_crew reply may be cached
+
+                if canon["confidence"] >= QUERY_CONFIDENCE and cache_key in st.session_state.query_cache:
+                    reply = st.session_state.query_cache[cache_key]
+                elif canon["confidence"] >= QUERY_CONFIDENCE:
+                    result = quick_crew.kickoff(inputs={"search_query": canon["query"]})
+                    reply = result.raw
+                    store_key = cache_key
+                else:
+                    result = shopping_crew.kickoff(inputs={"user_input": user_msg})
+                    reply = result.raw
 
                 try:
                     products = json.loads(reply)
                     if not isinstance(products, list):
                         raise ValueError("Not a list")
+                    if store_key:
+                        # Only cache well-formed results; error text must not be replayed
+                        st.session_state.query_cache[store_key] = reply
 
                     for idx, product in enumerate(products, 1):
                         st.markdown(f"### 🛒 Option {idx}: {product.get('name', 'No Name')}")
@@ -0,0 +1,153 @@
+# query_canon.py
+# Local grocery query canonicalization: turns text like "sasti doodh 1 litre" into
+# {item, brand, size, unit} without an LLM round-trip.
+import os, re, warnings
+
+LEXICON_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "grocery_lexicon.tsv")
+
+_TOKEN_RE = re.compile(r"\d*\.\d+|\d+|[^\W\d_]+")  # ".5" is a number, not "5"
+_THOUSANDS_RE = re.compile(r"(?<=\d),(?=\d{3}(?!\d))")  # "1,000" -> "1000"
+_END = ""  # trie terminal key (never a token)
+
+def tokenize(text: str):
+    return _TOKEN_RE.findall(_THOUSANDS_RE.sub("", (text or "").lower()))
+
+def load_lexicon(path: str = LEXICON_PATH):
+    # Returns a token trie: {token: {token: {..., "": (kind, canonical, extra)}}}
+    trie = {}
+    with open(path, encoding="utf-8") as f:
+        for lineno, line in enumerate(f, 1):
+            line = line.rstrip("\r\n")
+            if not line or line.startswith("#"):
+                continue
+            fields = line.split("\t")
+            if len(fields) < 3:
+                warnings.warn(f"{os.path.basename(path)}:{lineno}: expected kind, canonical, synonyms; row skipped")
+                continue
+            kind, canonical, synonyms, *rest = fields
+            entry = (kind, canonical, rest[0] if rest else "")
+            for phrase in synonyms.split("|"):
+                node = trie
+                for tok in tokenize(phrase):
+                    node = node.setdefault(tok, {})
+                if node is not trie:
+                    node[_END] = entry
+    return trie
+
+def _longest_match(trie, tokens, start):
+    node, found, end = trie, None, start
+    for i in range(start, len(tokens)):
+        node = node.get(tokens[i])
+        if node is None:
+            break
+        if _END in node:
+            found, end = node[_END], i + 1
+    return found, end
+
+def _fmt_number(x: float) -> str:
+    return str(int(x)) if float(x).is_integer() else f"{x:g}"
+
+def canonicalize(text: str, lexicon, brand: str = None):
+    """
+    Parse a grocery query into {item, variant, brand, size, unit, query, key, confidence}.
+    confidence is the share of tokens explained by the lexicon. It is 0 when no
+    single item is found, sizes/brands/variants conflict, a word is unknown, or a
+    number is not attached to a unit (the latter two would otherwise be dropped
+    from the query). Callers fall back to the LLM below their threshold.
+    """
+    tokens = tokenize(text)
+    items, variants, brands, default_items = [], [], [], []
+    size, unit, base = None, None, None
+    pending, covered, i = None, 0, 0  # pending: (value, token_span) awaiting a unit
+    unknown, sizes = False, 0
+
+    while i < len(tokens):
+        tok = tokens[i]
+        if not tok[0].isalpha():
+            unknown = unknown or pending is not None  # previous number had no unit
+            pending, i = (float(tok), 1), i + 1
+            continue
+        entry, end = _longest_match(lexicon, tokens, i)
+        if entry is None:
+            pending, i, unknown = None, i + 1, True
+            continue
+        kind, canonical, extra = entry
+        span = end - i
+        if kind == "number":
+            unknown = unknown or pending is not None
+            pending, i = (float(canonical), span), end
+            continue
+        if kind != "unit" and pending is not None:
+            unknown = True  # e.g. "300 rs": a budget/count we cannot represent
+        if kind == "unit":
+            qty, qty_span = pending or (1.0, 0)
+            if qty <= 0:
+                pending, i, unknown = None, end, True  # never emit a zero size
+                continue
+            size, unit, base = qty, canonical, extra
+            sizes += 1
+            span += qty_span
+        elif kind == "item":
+            items.append(canonical)
+        elif kind == "variant":
+            item, _, variant = canonical.partition(":")
+            items.append(item)
+            variants.append(variant)
+        elif kind == "brand":
+            brands.append(canonical)
+            if extra:
+                default_items.append(extra)
+        pending = None
+        covered += span
+        i = end
+    if pending is not None:
+        unknown = True  # trailing number without a unit
+
+    if brand:
+        # Sidebar brand filter wins over the text's brand, but never changes the
+        # product the text implies; its default item is used only when there is none.
+        entry, end = _longest_match(lexicon, tokenize(brand), 0)
+        if entry and entry[0] == "brand" and end == len(tokenize(brand)):
+            brands = [entry[1]]
+            if not default_items and entry[2]:
+                default_items = [entry[2]]
+        else:
+            brands = [brand.strip()]
+
+    item_set = list(dict.fromkeys(items or default_items))
+    confidence = round(covered / len(tokens), 3) if tokens else 0.0
+    if (unknown or sizes > 1 or len(item_set) != 1
+            or len(set(brands)) > 1 or len(set(variants)) > 1):
+        confidence = 0.0
+
+    result = {
+        "item": item_set[0] if len(item_set) == 1 else None,
+        "variant": variants[0] if len(set(variants)) == 1 else None,
+        "brand": brands[0] if brands else None,
+        "size": size,
+        "unit": unit,
+        "confidence": confidence,
+    }
+
+    parts = ["cheapest"]
+    if result["brand"]:
+        parts.append(result["brand"])
+    if result["variant"]:
+        parts.append(result["variant"])
+    if result["item"]:
+        parts.append(result["item"])
+    if size is not None:
+        parts.append(f"{_fmt_number(size)} {unit}")
+    result["query"] = " ".join(parts)
+
+    # Cache key normalizes units (1 kg == 1000 g == 4 pao) so equivalent queries collide.
+    size_key = ""
+    if size is not None:
+        base_unit, _, factor = base.partition(":")
+        size_key = f"{_fmt_number(size * float(factor or 1))}{base_unit or unit}"
+    result["key"] = "|".join([
+        ":".join(filter(None, [result["item"], result["variant"]])).lower(),
+        (result["brand"] or "").lower(),
+        size_key,
+    ])
+    return result
@@ -0,0 +1,118 @@
+# test_query_canon.py
+import pytest
+
+from query_canon import load_lexicon, canonicalize, tokenize
+
+THRESHOLD = 0.75  # app.py QUERY_CONFIDENCE default
+
+
+@pytest.fixture(scope="module")
+def lexicon():
+    return load_lexicon()
+
+
+def test_roman_urdu_query(lexicon):
+    r = canonicalize("sasti doodh 1 litre", lexicon)
+    assert (r["item"], r["size"], r["unit"]) == ("Milk", 1.0, "litre")
+    assert r["query"] == "cheapest Milk 1 litre"
+    assert r["key"] == "milk||1000ml"
+    assert r["confidence"] >= THRESHOLD
+
+
+def test_brand_implies_item(lexicon):
+    r = canonicalize("tapal 950g", lexicon)
+    assert (r["item"], r["brand"]) == ("Tea", "Tapal")
+    assert r["key"] == "tea|tapal|950g"
+
+
+@pytest.mark.parametrize("text", ["1 kg cheeni", "1000 g cheeni", "4 pao cheeni", "ek kilo cheeni"])
+def test_unit_equivalence(lexicon, text):
+    assert canonicalize(text, lexicon)["key"] == "sugar||1000g"
+
+
+@pytest.mark.parametrize("a, b", [
+    ("green tea 1 box", "black tea 1 box"),
+    ("sella rice", "basmati rice"),
+    ("desi ghee", "banaspati ghee"),
+    ("paneer", "mozzarella"),
+    ("moong daal", "masoor daal"),
+])
+def test_variants_kept_apart(lexicon, a, b):
+    ra, rb = canonicalize(a, lexicon), canonicalize(b, lexicon)
+    assert ra["item"] == rb["item"]
+    assert ra["variant"] and rb["variant"]
+    assert ra["key"] != rb["key"]
+    assert ra["query"] != rb["query"]
+
+
+def test_variant_in_query(lexicon):
+    r = canonicalize("green tea 1 box", lexicon)
+    assert r["query"] == "cheapest Green Tea 1 pack"
+    assert r["key"] == "tea:green||1pack"
+
+
+@pytest.mark.parametrize("text", [
+    "skimmed milk 1 litre",      # unknown qualifier
+    "brown bread 1 packet",
+    "best rice for biryani",
+    "cheapest milk and bread",   # two items
+    "basmati sella rice",        # conflicting variants
+    "iphone 15",                 # not a grocery
+    "mirch",                     # ambiguous chilli
+    "0 kg sugar",                # zero size
+    "sasti doodh 1 litre 300 rs",  # numbers without a unit
+    "doodh 1 litre 2",
+    "sugar 5 kg 200",
+    "max price 500 milk",        # "max" is not the Max brand
+    "",
+])
+def test_low_confidence_falls_back(lexicon, text):
+    assert canonicalize(text, lexicon)["confidence"] < THRESHOLD
+
+
+@pytest.mark.parametrize("text", ["1 kg 500 g cheeni", "milk 1 litre 6 pack"])
+def test_conflicting_sizes_fall_back(lexicon, text):
+    assert canonicalize(text, lexicon)["confidence"] == 0.0
+
+
+def test_green_and_red_chilli(lexicon):
+    assert canonicalize("hari mirch 250 g", lexicon)["item"] == "Green Chilli"
+    assert canonicalize("lal mirch 250 g", lexicon)["item"] == "Red Chilli"
+
+
+def test_thousands_separator(lexicon):
+    assert tokenize("1,000 g sugar") == ["1000", "g", "sugar"]
+    r = canonicalize("1,000 g sugar", lexicon)
+    assert (r["size"], r["unit"], r["key"]) == (1000.0, "g", "sugar||1000g")
+    assert r["confidence"] >= THRESHOLD
+
+
+def test_leading_dot_decimal(lexicon):
+    assert tokenize(".5 kg sugar") == [".5", "kg", "sugar"]
+    r = canonicalize(".5 kg sugar", lexicon)
+    assert (r["size"], r["key"]) == (0.5, "sugar||500g")
+    assert canonicalize("1.5 ltr doodh", lexicon)["key"] == "milk||1500ml"
+
+
+def test_sidebar_brand_override(lexicon):
+    r = canonicalize("olpers doodh", lexicon, brand="haleeb")
+    assert r["brand"] == "Haleeb"
+    assert r["key"] == "milk|haleeb|"
+
+    r = canonicalize("olpers", lexicon, brand="tapal")
+    assert (r["item"], r["brand"]) == ("Milk", "Tapal")
+
+    r = canonicalize("1 kg", lexicon, brand="tapal")
+    assert r["item"] == "Tea"
+
+    r = canonicalize("doodh", lexicon, brand="Acme")
+    assert r["brand"] == "Acme"
+    assert r["confidence"] >= THRESHOLD
+
+
+def test_malformed_row_is_skipped(tmp_path):
+    path = tmp_path / "lexicon.tsv"
+    path.write_text("item\tMilk\tmilk|doodh\nbroken row\n", encoding="utf-8")
+    with pytest.warns(UserWarning, match=":2:"):
+        lexicon = load_lexicon(str(path))
+    assert canonicalize("doodh", lexicon)["item"] == "Milk"